@@ -1,7 +1,6 @@
 import sys
 
 import click
-import plexapi
 
 from plex_music_ratings_sync import APP_DESCRIPTION, APP_NAME, __version__
 from plex_music_ratings_sync.config import init_config
@@ -61,6 +60,8 @@ def _colorize_path(text):
 @cli.command("info")
 def show_info():
     """Show system information and configuration paths."""
+    import plexapi
+
     click.echo(f"{APP_NAME} Version: {_colorize_version(__version__)}")
     click.echo(f"Python Version: {_colorize_version(sys.version.split()[0])}")
     click.echo(f"PlexAPI Version: {_colorize_version(plexapi.VERSION)}")
@@ -1,8 +1,7 @@
 import sys
 import os
 from shutil import copyfile
-
-import yaml
+from types import MappingProxyType
 
 # Wir importieren log_error/log_info zwar, nutzen sie aber nur da, wo es sicher ist
 from plex_music_ratings_sync.logger import log_error, log_info
@@ -15,6 +14,9 @@ from plex_music_ratings_sync.util.paths import (
 _config = None
 """User configuration data."""
 
+_plex_config = None
+"""Validated (read-only) Plex configuration, computed once on first access."""
+
 
 def _create_config(config_file_path):
     """Create a new configuration file from the template."""
@@ -27,6 +29,9 @@ def init_config():
     """Initialize the configuration by checking Env Vars first, then falling back to YAML config file."""
     global _config
 
+    if _config is not None:
+        return
+
     # --- STRATEGY 1: Environment Variables (Docker Friendly) ---
     plex_url = os.getenv('PLEX_URL')
     plex_token = os.getenv('PLEX_TOKEN')
@@ -63,12 +68,23 @@ def init_config():
     if not config_file_path.exists():
         _create_config(config_file_path)
 
+    # Imported here so env var configs never load PyYAML
+    import yaml
+
+    # Prefer the libyaml bindings when PyYAML was built with them
+    yaml_loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
     with open(config_file_path, "r") as config_file:
-        _config = yaml.safe_load(config_file)
+        _config = yaml.load(config_file, Loader=yaml_loader)
 
 
 def get_plex_config():
     """Retrieve the Plex configuration."""
+    global _plex_config
+
+    if _plex_config is not None:
+        return _plex_config
+
     if _config is None:
         # Hier ist print() auch sicherer, falls logger noch tot ist, aber log_error könnte gehen
         print("ERROR: Configuration not initialized.") 
@@ -83,4 +99,6 @@ def get_plex_config():
         print("ERROR: The Plex configuration is not valid")
         sys.exit(1)
 
-    return plex_config
\ No newline at end of file
+    _plex_config = MappingProxyType(plex_config)
+
+    return _plex_config
\ No newline at end of file
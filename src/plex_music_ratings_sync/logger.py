@@ -1,5 +1,7 @@
 import logging
 import re
+import threading
+from contextlib import contextmanager
 from inspect import currentframe
 from pathlib import Path
 
@@ -11,9 +13,18 @@ from plex_music_ratings_sync.util.paths import get_log_dir, get_log_file_path
 MAX_LOG_FILES = 7
 """Maximum number of log files to keep."""
 
+LOG_FILE_BUFFER_SIZE = 64 * 1024
+"""Write buffer size of the log file."""
+
 _logger = None
 """Application logger instance."""
 
+_buffered = threading.local()
+"""Per-thread list of log records held back by ``buffered_logs()``."""
+
+_buffered_emit_lock = threading.Lock()
+"""Lock that keeps each thread's buffered records together when emitted."""
+
 
 class PlainFormatter(logging.Formatter):
     """A formatter that uses standard log format for file output."""
@@ -34,6 +45,38 @@ class PlainFormatter(logging.Formatter):
         return super().format(record)
 
 
+class BufferedFileHandler(logging.FileHandler):
+    """
+    A file handler that keeps records in a large write buffer instead of flushing
+    after every record. The buffer is written out by ``flush_logs()``, on close, and
+    right away for errors so they survive a crash.
+    """
+
+    def emit(self, record):
+        """Write the record, flushing immediately for errors and above."""
+        super().emit(record)
+
+        if record.levelno >= logging.ERROR:
+            self.flush_now()
+
+    def _open(self):
+        """Open the log file with a large write buffer."""
+        return open(
+            self.baseFilename,
+            self.mode,
+            buffering=LOG_FILE_BUFFER_SIZE,
+            encoding=self.encoding,
+            errors=self.errors,
+        )
+
+    def flush(self):
+        """Skip the per-record flush; see ``flush_now()``."""
+
+    def flush_now(self):
+        """Write the buffered records to the log file."""
+        super().flush()
+
+
 class ColoredFormatter(logging.Formatter):
     """
     A custom formatter that adds colors and styling to log messages.
@@ -122,11 +165,62 @@ def init_logging(quiet=None, verbose=None):
     console_handler.setFormatter(ColoredFormatter())
     _logger.addHandler(console_handler)
 
-    file_handler = logging.FileHandler(get_log_file_path(), mode="w")
+    file_handler = BufferedFileHandler(get_log_file_path(), mode="w")
     file_handler.setFormatter(PlainFormatter())
     _logger.addHandler(file_handler)
 
 
+def flush_logs():
+    """Write any buffered log records to the log file."""
+    for handler in _logger.handlers:
+        if isinstance(handler, BufferedFileHandler):
+            handler.flush_now()
+
+
+def log_debug_enabled():
+    """Check if debug messages are logged, to skip building them otherwise."""
+    return _logger.isEnabledFor(logging.DEBUG)
+
+
+def log_info_enabled():
+    """Check if info messages are logged, to skip building them otherwise."""
+    return _logger.isEnabledFor(logging.INFO)
+
+
+@contextmanager
+def buffered_logs():
+    """
+    Hold back all log records of the current thread and emit them together on exit,
+    so that messages logged concurrently by other threads don't interleave with them.
+    """
+    records = []
+    _buffered.records = records
+
+    try:
+        yield
+    finally:
+        _buffered.records = None
+
+        with _buffered_emit_lock:
+            for record in records:
+                _logger.handle(record)
+
+
+def _emit(level, message, indent, pathname, lineno):
+    """Log the message right away, or hold it back inside ``buffered_logs()``."""
+    extra = {"indent": indent, "caller_pathname": pathname, "caller_lineno": lineno}
+    records = getattr(_buffered, "records", None)
+
+    if records is None:
+        _logger.log(level, message, extra=extra)
+    else:
+        records.append(
+            _logger.makeRecord(
+                _logger.name, level, pathname, lineno, message, None, None, extra=extra
+            )
+        )
+
+
 def _get_caller_info():
     """Get the filename and line number of the caller of the logging function."""
     current_frame = currentframe()
@@ -142,49 +236,49 @@ def _get_caller_info():
 
 def log_debug(message, indent=0):
     """Log a debug message with the specified indentation level."""
+    if not _logger.isEnabledFor(logging.DEBUG):
+        return
+
     pathname, lineno = _get_caller_info()
 
-    _logger.debug(
-        message,
-        extra={"indent": indent, "caller_pathname": pathname, "caller_lineno": lineno},
-    )
+    _emit(logging.DEBUG, message, indent, pathname, lineno)
 
 
 def log_info(message, indent=0):
     """Log an info message with the specified indentation level."""
+    if not _logger.isEnabledFor(logging.INFO):
+        return
+
     pathname, lineno = _get_caller_info()
 
-    _logger.info(
-        message,
-        extra={"indent": indent, "caller_pathname": pathname, "caller_lineno": lineno},
-    )
+    _emit(logging.INFO, message, indent, pathname, lineno)
 
 
 def log_warning(message, indent=0):
     """Log a warning message with the specified indentation level."""
+    if not _logger.isEnabledFor(logging.WARNING):
+        return
+
     pathname, lineno = _get_caller_info()
 
-    _logger.warning(
-        message,
-        extra={"indent": indent, "caller_pathname": pathname, "caller_lineno": lineno},
-    )
+    _emit(logging.WARNING, message, indent, pathname, lineno)
 
 
 def log_error(message, indent=0):
     """Log an error message with the specified indentation level."""
+    if not _logger.isEnabledFor(logging.ERROR):
+        return
+
     pathname, lineno = _get_caller_info()
 
-    _logger.error(
-        message,
-        extra={"indent": indent, "caller_pathname": pathname, "caller_lineno": lineno},
-    )
+    _emit(logging.ERROR, message, indent, pathname, lineno)
 
 
 def log_critical(message, indent=0):
     """Log a critical message with the specified indentation level."""
+    if not _logger.isEnabledFor(logging.CRITICAL):
+        return
+
     pathname, lineno = _get_caller_info()
 
-    _logger.critical(
-        message,
-        extra={"indent": indent, "caller_pathname": pathname, "caller_lineno": lineno},
-    )
+    _emit(logging.CRITICAL, message, indent, pathname, lineno)
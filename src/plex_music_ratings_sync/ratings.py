@@ -6,7 +6,12 @@ from mutagen.mp4 import MP4
 from mutagen.oggopus import OggOpus
 from mutagen.oggvorbis import OggVorbis
 
-from plex_music_ratings_sync.logger import log_debug, log_error, log_info
+from plex_music_ratings_sync.logger import (
+    log_debug,
+    log_debug_enabled,
+    log_error,
+    log_info,
+)
 from plex_music_ratings_sync.state import is_dry_run
 
 _PRIMARY_MP3_RATING_MAP = {
@@ -428,14 +433,12 @@ def set_rating_to_file(file_path, plex_rating):
             _set_rating_to_vorbis(file_path, plex_rating, file_type)
 
 
-def get_rating_from_plex(plex_item):
+def parse_plex_rating(rating_raw):
     """
-    Read rating from a Plex media item. Converts Plex's rating to an integer on the
+    Convert a raw Plex rating value (as found in the item's XML) to an integer on the
     1-10 scale.
     """
     try:
-        rating_raw = plex_item.userRating
-
         if rating_raw is None:
             log_debug("▸ No rating found in Plex media", 4)
             return None
@@ -445,7 +448,8 @@ def get_rating_from_plex(plex_item):
         if rating == 0:
             rating = None
 
-        log_debug(f"▸ Successfully read Plex rating: **{rating}**", 4)
+        if log_debug_enabled():
+            log_debug(f"▸ Successfully read Plex rating: **{rating}**", 4)
 
         return rating
     except Exception as e:
@@ -2,82 +2,273 @@ import sys
 import json
 import os
 import atexit
-from datetime import datetime
+import errno
+import functools
+import itertools
+import signal
+import stat
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from plexapi.server import PlexServer
-
 from plex_music_ratings_sync.config import get_plex_config
-from plex_music_ratings_sync.logger import log_debug, log_error, log_info, log_warning
+from plex_music_ratings_sync.logger import (
+    buffered_logs,
+    flush_logs,
+    log_debug,
+    log_debug_enabled,
+    log_error,
+    log_info,
+    log_info_enabled,
+    log_warning,
+)
 from plex_music_ratings_sync.ratings import (
     get_rating_from_file,
-    get_rating_from_plex,
+    parse_plex_rating,
     set_rating_to_file,
     set_rating_to_plex,
 )
 from plex_music_ratings_sync.state import is_dry_run
 from plex_music_ratings_sync.util.datetime import format_time
 
-_SUPPORTED_EXTENSIONS = (".flac", ".m4a", ".mp3", ".ogg", ".opus", ".aif", ".aiff")
+_SUPPORTED_EXTENSIONS = frozenset(
+    (".flac", ".m4a", ".mp3", ".ogg", ".opus", ".aif", ".aiff")
+)
 """Audio file extensions that are supported for rating synchronization."""
 
+_MISSING_FILE_ERRNOS = frozenset((errno.ENOENT, errno.ENOTDIR, errno.ELOOP, errno.EBADF))
+"""stat() errors that mean the file is not there, as ignored by ``Path.exists()``."""
+
+_MISSING_FILE_WINERRORS = frozenset((21, 123, 1921))
+"""Windows stat() errors ignored by ``Path.exists()`` (not ready, bad name, link loop)."""
+
+_MAX_WORKERS = 16
+"""Number of tracks processed concurrently (Plex requests and file I/O)."""
+
+_TRACK_PAGE_SIZE = 500
+"""Number of tracks requested from Plex per page."""
+
 # --- CACHE CONFIGURATION START ---
 # Determine the best location for the cache file
 # Priority: 
-# 1. CRON_CONFIG_DIR or CONFIG_DIR (Env Vars)
+# 1. CRON_CONFIG_DIR or CONFIG_DIR (Env Vars, used as-is and created if missing)
 # 2. /config (Standard Docker)
 # 3. /app/data (Current Container Image default)
 # 4. Current working directory (Fallback)
 
-search_paths = [
-    os.getenv('CRON_CONFIG_DIR'),
-    os.getenv('CONFIG_DIR'),
-    '/config',
-    '/app/data',
-    '.'
-]
+@functools.cache
+def _cache_dir():
+    # Resolved on first use rather than at import time
+    for env_var in ('CRON_CONFIG_DIR', 'CONFIG_DIR'):
+        path = os.getenv(env_var)
+        if path:
+            # An explicitly configured directory wins without probing the others
+            return Path(path)
+
+    for path in ('/config', '/app/data'):
+        try:
+            if stat.S_ISDIR(os.stat(path).st_mode):
+                return Path(path)
+        except OSError:
+            continue
+
+    return Path('.')
 
-config_path = Path('.')
-for path in search_paths:
-    if path and os.path.exists(path):
-        config_path = Path(path)
-        break
+def _cache_file():
+    return _cache_dir() / 'rating_cache.db'
 
-CACHE_FILE = config_path / 'rating_cache.json'
-CACHE_SAVE_INTERVAL = 50 
+def _legacy_cache_file():
+    return _cache_dir() / 'rating_cache.json'
 
 _file_rating_cache = {}
-_cache_dirty = False
+_cache_conn = None
+_cache_lock = threading.Lock()
+
+def _import_legacy_cache(conn, legacy_cache_file):
+    # One-time migration of the old JSON cache into the SQLite store
+    try:
+        # Read in one go; json.loads on bytes avoids the text-mode decode layer
+        legacy_cache = json.loads(legacy_cache_file.read_bytes())
+        conn.executemany(
+            "INSERT OR REPLACE INTO ratings (path, mtime, rating) VALUES (?, ?, ?)",
+            (
+                (path, entry.get('mtime'), entry.get('rating'))
+                for path, entry in legacy_cache.items()
+            ),
+        )
+        conn.commit()
+        log_info(f"Migrated {len(legacy_cache)} entries from {legacy_cache_file}")
+    except Exception as e:
+        conn.rollback()
+        log_error(f"Failed to migrate legacy cache: {e}")
+
+_SQLITE_CORRUPT = 11
+_SQLITE_NOTADB = 26
+
+def _is_cache_corrupt(error):
+    # Only a damaged file counts; locked, read-only or I/O errors leave it alone
+    error_code = getattr(error, 'sqlite_errorcode', None)
+    if error_code is not None:
+        return error_code & 0xff in (_SQLITE_CORRUPT, _SQLITE_NOTADB)
+    # Before Python 3.11 sqlite3 maps exactly these two codes to the base class
+    return type(error) is sqlite3.DatabaseError
+
+def _open_cache(cache_file):
+    # Tracks are processed by worker threads; all access goes through _cache_lock
+    conn = sqlite3.connect(cache_file, check_same_thread=False)
+    try:
+        # WAL keeps every commit atomic, so a crash mid-save can't corrupt the cache
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ratings "
+            "(path TEXT PRIMARY KEY, mtime REAL, rating INTEGER)"
+        )
+
+        # Damaged pages would otherwise only surface on a later read
+        check_result = conn.execute("PRAGMA quick_check").fetchone()[0]
+        if check_result != 'ok':
+            raise sqlite3.DatabaseError(f"quick_check failed: {check_result}")
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+def _read_cache(conn):
+    # Keep reads free during the run by loading everything up front
+    return {
+        path: {'mtime': mtime, 'rating': rating}
+        for path, mtime, rating in conn.execute(
+            "SELECT path, mtime, rating FROM ratings"
+        )
+    }
+
+def _discard_corrupt_cache(cache_file):
+    # Keep the broken database (and its WAL) around for inspection and start over
+    corrupt_file = cache_file.with_name(cache_file.name + '.corrupt')
+    os.replace(cache_file, corrupt_file)
+    try:
+        os.replace(f"{cache_file}-wal", f"{corrupt_file}-wal")
+    except FileNotFoundError:
+        pass
+    try:
+        # The shared-memory index is rebuilt from the WAL and holds no data
+        os.remove(f"{cache_file}-shm")
+    except FileNotFoundError:
+        pass
+    log_warning(f"Cache database was corrupt and moved to {corrupt_file}")
 
 def load_cache():
-    global _file_rating_cache
-    if CACHE_FILE.exists():
-        try:
-            with open(CACHE_FILE, 'r') as f:
-                _file_rating_cache = json.load(f)
-                log_info(f"Loaded rating cache with {len(_file_rating_cache)} entries from {CACHE_FILE}")
-        except Exception as e:
-            log_error(f"Failed to load cache: {e}")
-            _file_rating_cache = {}
-    else:
-        log_info(f"No cache found at {CACHE_FILE}, starting fresh.")
+    global _file_rating_cache, _cache_conn
+    cache_file = _cache_file()
+    conn = None
+    try:
+        # Ensure directory exists
+        if not cache_file.parent.exists():
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
 
-def save_cache():
-    global _cache_dirty
-    if _cache_dirty:
-        try:
-            # Ensure directory exists
-            if not CACHE_FILE.parent.exists():
-                CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not cache_file.exists()
 
-            with open(CACHE_FILE, 'w') as f:
-                json.dump(_file_rating_cache, f)
-            _cache_dirty = False
-        except Exception as e:
-            log_error(f"Failed to save cache: {e}")
+        try:
+            conn = _open_cache(cache_file)
+            file_rating_cache = _read_cache(conn)
+        except sqlite3.DatabaseError as e:
+            if conn is not None:
+                conn.close()
+                conn = None
+            if is_new or not _is_cache_corrupt(e):
+                raise
+            _discard_corrupt_cache(cache_file)
+            is_new = True
+            conn = _open_cache(cache_file)
+            file_rating_cache = {}
+
+        legacy_cache_file = _legacy_cache_file()
+        if is_new and legacy_cache_file.exists():
+            _import_legacy_cache(conn, legacy_cache_file)
+            file_rating_cache = _read_cache(conn)
+
+        _file_rating_cache = file_rating_cache
+        _cache_conn = conn
+
+        if _file_rating_cache:
+            log_info(f"Loaded rating cache with {len(_file_rating_cache)} entries from {cache_file}")
+        else:
+            log_info(f"No cache found at {cache_file}, starting fresh.")
+    except Exception as e:
+        log_error(f"Failed to load cache: {e}")
+        if conn is not None:
+            conn.close()
+        _file_rating_cache = {}
+        _cache_conn = None
+
+def _cache_set(path, mtime, rating):
+    entry = {'mtime': mtime, 'rating': rating}
+    with _cache_lock:
+        # Unchanged entries must not open a write transaction
+        if _file_rating_cache.get(path) == entry:
+            return
+        _file_rating_cache[path] = entry
+        if _cache_conn is not None:
+            _cache_conn.execute(
+                "INSERT OR REPLACE INTO ratings (path, mtime, rating) VALUES (?, ?, ?)",
+                (path, mtime, rating),
+            )
+
+def _cache_delete(path):
+    with _cache_lock:
+        if _file_rating_cache.pop(path, None) is None:
+            return
+        if _cache_conn is not None:
+            _cache_conn.execute("DELETE FROM ratings WHERE path = ?", (path,))
+
+def _cache_file_write(path, rating):
+    # Record a rating just written to a file under its new mtime
+    if is_dry_run():
+        # Nothing was written, so the cached file rating is still accurate
+        return
+    try:
+        _cache_set(path, os.stat(path).st_mtime, rating)
+    except Exception:
+        _cache_delete(path)
 
-# Save cache automatically when script exits
-atexit.register(save_cache)
+def save_cache():
+    # Writes are batched in the implicit transaction opened by the first change
+    with _cache_lock:
+        if _cache_conn is not None and _cache_conn.in_transaction:
+            try:
+                _cache_conn.commit()
+            except Exception as e:
+                _cache_conn.rollback()
+                log_error(f"Failed to save cache: {e}")
+
+def close_cache():
+    global _cache_conn
+    save_cache()
+    with _cache_lock:
+        if _cache_conn is not None:
+            _cache_conn.close()
+            _cache_conn = None
+
+def _handle_sigterm(signum, frame):
+    # Turn SIGTERM (e.g. `docker stop`) into a normal exit so atexit handlers run
+    sys.exit(128 + signum)
+
+_exit_handlers_installed = False
+
+def _install_exit_handlers():
+    # Save cache automatically when the run exits (normally or via SIGTERM).
+    # Done when a run starts, not at import, to keep importing this module inert.
+    global _exit_handlers_installed
+    if _exit_handlers_installed:
+        return
+    atexit.register(close_cache)
+    # Signal handlers can only be installed from the main thread
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _handle_sigterm)
+    _exit_handlers_installed = True
 # --- CACHE CONFIGURATION END ---
 
 
@@ -85,16 +276,28 @@ class RatingSync:
     def __init__(self):
         # Load Cache
         load_cache()
+        _install_exit_handlers()
         
         # List to store changes for the final summary
         self.updated_tracks = [] 
+        self._updated_tracks_lock = threading.Lock()
 
         plex_config = get_plex_config()
 
+        # Imported here so that importing this module stays cheap
+        from plexapi.server import PlexServer
+        from requests import Session
+        from requests.adapters import HTTPAdapter
+
+        # One shared session, with a connection pool large enough for all workers
+        session = Session()
+        session.mount("http://", HTTPAdapter(pool_maxsize=_MAX_WORKERS))
+        session.mount("https://", HTTPAdapter(pool_maxsize=_MAX_WORKERS))
+
         try:
             log_info(f"Connecting to Plex server: **{plex_config['url']}**")
 
-            self.plex = PlexServer(plex_config["url"], plex_config["token"])
+            self.plex = PlexServer(plex_config["url"], plex_config["token"], session=session)
 
             log_info(f"Connected to Plex server: **{self.plex.friendlyName}**")
         except Exception as e:
@@ -103,44 +306,97 @@ class RatingSync:
 
         self.libraries = plex_config["libraries"]
 
+        # Per-mode track handlers, so the per-track path never branches on the mode
+        self._track_processors = {
+            "import": self._import_track,
+            "export": self._export_track,
+            "sync": self._sync_track,
+        }
+
         if is_dry_run():
             log_warning("Running in dry-run mode (no changes will be made)")
 
-    def _process_item(self, item, mode="sync"):
+    def _track_change(self, item, action, old_val, new_val):
+        """Record a change for the summary (logged in one batch per library)."""
+        msg = f"⚡ {action}: {item.title} ({old_val} -> {new_val})"
+        with self._updated_tracks_lock:
+            self.updated_tracks.append(msg)
+
+    def _import_track(self, item, file_path_str, file_rating, plex_rating):
+        """Copy the file rating to Plex."""
+        if file_rating is None:
+            return
+
+        if plex_rating != file_rating:
+            self._track_change(item, "IMPORT (File->Plex)", plex_rating, file_rating)
+            set_rating_to_plex(item, file_rating)
+        else:
+            log_debug("▸ Plex rating already matches file", 4)
+
+    def _export_track(self, item, file_path_str, file_rating, plex_rating):
+        """Copy the Plex rating to the file."""
+        if plex_rating is None:
+            return
+
+        if file_rating != plex_rating:
+            self._track_change(item, "EXPORT (Plex->File)", file_rating, plex_rating)
+            set_rating_to_file(file_path_str, plex_rating)
+            _cache_file_write(file_path_str, plex_rating)
+        else:
+            log_debug("▸ File rating already matches Plex", 4)
+
+    def _sync_track(self, item, file_path_str, file_rating, plex_rating):
+        """Sync ratings both ways, with Plex taking precedence when both are set."""
+        if plex_rating == file_rating:
+            log_debug("▸ Ratings are already in sync", 4)
+        elif plex_rating is not None:
+            self._track_change(item, "SYNC (Plex->File)", file_rating, plex_rating)
+            set_rating_to_file(file_path_str, plex_rating)
+            _cache_file_write(file_path_str, plex_rating)
+        else:
+            self._track_change(item, "SYNC (File->Plex)", plex_rating, file_rating)
+            set_rating_to_plex(item, file_rating)
+
+    def _process_item(self, item, plex_ratings, process_track):
         """
-        Process a single track with the specified mode.
+        Process a single track with the given mode handler, using the raw Plex rating
+        prefetched for its page of tracks.
         """
-        global _file_rating_cache, _cache_dirty
-        
-        item_start_time = datetime.now()
+        item_start_time = time.perf_counter_ns()
 
-        file_path = Path(item.media[0].parts[0].file)
-        file_path_str = str(file_path)
+        # Resolve the media part once and work on the plain path string from here on
+        file_path_str = item.media[0].parts[0].file
+        file_name = os.path.basename(file_path_str)
+        file_ext = os.path.splitext(file_name)[1].lower()
 
-        track_index = item.index if item.index is not None else 0
+        # Bail out before any further Plex attribute access or filesystem work
+        if file_ext not in _SUPPORTED_EXTENSIONS:
+            log_warning(f"Skipping unsupported file type: {file_name}", 3)
+            return
 
         # Standard log (level 3 = verbose/debug usually)
-        log_info(
-            f"Track: **{track_index:02d}. {item.title}** ({file_path.name})",
-            3,
-        )
-
-        if not file_path.exists():
+        if log_info_enabled():
+            track_index = item.index if item.index is not None else 0
+            log_info(
+                f"Track: **{track_index:02d}. {item.title}** ({file_name})",
+                3,
+            )
+
+        # A single stat() both checks existence and provides the mtime for the cache
+        try:
+            current_mtime = os.stat(file_path_str).st_mtime
+        except OSError as e:
+            if (
+                e.errno not in _MISSING_FILE_ERRNOS
+                and getattr(e, "winerror", None) not in _MISSING_FILE_WINERRORS
+            ):
+                raise
             log_warning("▸ File not found on disk", 4)
             return
 
-        if file_path.suffix.lower() not in _SUPPORTED_EXTENSIONS:
-            log_warning("▸ Skipping unsupported file type", 4)
-            return
-
-        plex_rating = get_rating_from_plex(item)
+        plex_rating = parse_plex_rating(plex_ratings.get(item.ratingKey))
         
         # --- CACHE LOGIC START ---
-        try:
-            current_mtime = file_path.stat().st_mtime
-        except FileNotFoundError:
-            return 
-
         file_rating = None
         
         # Check if file is in cache and valid
@@ -149,84 +405,79 @@ class RatingSync:
         if cache_entry and cache_entry.get('mtime') == current_mtime:
             # CACHE HIT: Use cached rating
             file_rating = cache_entry.get('rating')
+
+            # Cached file rating already equals Plex, so no mode has work to do
+            if file_rating == plex_rating:
+                log_debug("▸ Cached file rating already matches Plex", 4)
+                return
         else:
             # CACHE MISS: Read from file
             file_rating = get_rating_from_file(file_path_str)
             
             # Update cache
-            _file_rating_cache[file_path_str] = {
-                'mtime': current_mtime,
-                'rating': file_rating
-            }
-            _cache_dirty = True
+            _cache_set(file_path_str, current_mtime, file_rating)
         # --- CACHE LOGIC END ---
 
-        # Helper to track changes
-        def track_change(action, old_val, new_val):
-            msg = f"⚡ {action}: {item.title} ({old_val} -> {new_val})"
-            log_warning(msg)
-            self.updated_tracks.append(msg)
+        process_track(item, file_path_str, file_rating, plex_rating)
 
-        if mode == "import" and file_rating is not None:
-            if plex_rating != file_rating:
-                track_change("IMPORT (File->Plex)", plex_rating, file_rating)
-                set_rating_to_plex(item, file_rating)
-            else:
-                log_debug("▸ Plex rating already matches file", 4)
-                
-        elif mode == "export" and plex_rating is not None:
-            if file_rating != plex_rating:
-                track_change("EXPORT (Plex->File)", file_rating, plex_rating)
-                set_rating_to_file(file_path_str, plex_rating)
-                
-                # Update Cache after Write
-                try:
-                    new_mtime = file_path.stat().st_mtime
-                    _file_rating_cache[file_path_str] = {
-                        'mtime': new_mtime,
-                        'rating': plex_rating
-                    }
-                    _cache_dirty = True
-                except Exception:
-                    if file_path_str in _file_rating_cache:
-                        del _file_rating_cache[file_path_str]
-
-            else:
-                log_debug("▸ File rating already matches Plex", 4)
-                
-        elif mode == "sync":
-            if plex_rating != file_rating:
-                if plex_rating is not None:
-                    track_change("SYNC (Plex->File)", file_rating, plex_rating)
-                    set_rating_to_file(file_path_str, plex_rating)
-                    
-                    # Update Cache after Write
-                    try:
-                        new_mtime = file_path.stat().st_mtime
-                        _file_rating_cache[file_path_str] = {
-                            'mtime': new_mtime,
-                            'rating': plex_rating
-                        }
-                        _cache_dirty = True
-                    except Exception:
-                        if file_path_str in _file_rating_cache:
-                            del _file_rating_cache[file_path_str]
-
-                elif file_rating is not None:
-                    track_change("SYNC (File->Plex)", plex_rating, file_rating)
-                    set_rating_to_plex(item, file_rating)
-            else:
-                log_debug("▸ Ratings are already in sync", 4)
-
-        item_elapsed_time = datetime.now() - item_start_time
-
-        log_debug(f"▸ Processed in **{format_time(item_elapsed_time)}**", 4)
+        item_elapsed_time = time.perf_counter_ns() - item_start_time
+
+        if log_debug_enabled():
+            log_debug(f"▸ Processed in **{format_time(item_elapsed_time)}**", 4)
+
+    def _iter_track_pages(self, library_section):
+        """
+        Yield all tracks of a library section in pages. Tracks are fetched in bulk
+        (with their media info) instead of walking artists and albums one request at
+        a time, and paging keeps memory bounded on large libraries.
+        """
+        container_start = 0
+
+        while True:
+            # Sort by date added so tracks added by a library scan during the run
+            # land on later pages instead of shifting the offsets of earlier ones
+            tracks = library_section.search(
+                libtype="track",
+                sort="addedAt:asc",
+                includeGuids=False,
+                container_start=container_start,
+                container_size=_TRACK_PAGE_SIZE,
+                maxresults=_TRACK_PAGE_SIZE,
+            )
+
+            if not tracks:
+                return
+
+            yield tracks
+
+            if len(tracks) < _TRACK_PAGE_SIZE:
+                return
+
+            container_start += _TRACK_PAGE_SIZE
+
+    def _prefetch_plex_ratings(self, tracks):
+        """
+        Map each track's rating key to its raw Plex rating. The value is read from the
+        XML the bulk search already returned, since accessing a missing (unrated)
+        ``userRating`` attribute would make plexapi reload the item from the server.
+        """
+        # `_data` (the item's XML element) is a plexapi internal, relied on as of the
+        # pinned plexapi==4.16.1; re-check it when upgrading plexapi.
+        return {track.ratingKey: track._data.attrib.get("userRating") for track in tracks}
 
     def _process_libraries(self, mode="sync"):
         """Process all configured libraries with the specified mode."""
-        total_start_time = datetime.now()
+        total_start_time = time.perf_counter_ns()
         processed_tracks = 0
-        tracks_since_save = 0
+
+        # Resolve the mode handler once for the whole run
+        process_item = self._process_item
+        process_track = self._track_processors[mode]
+
+        def process(track, plex_ratings):
+            # Workers run concurrently, so keep each track's log lines together
+            with buffered_logs():
+                process_item(track, plex_ratings, process_track)
 
         for library_name in self.libraries:
             log_info(f"Processing Plex library: **{library_name}**")
@@ -237,40 +488,43 @@ class RatingSync:
                 log_error(f"Library not found: {library_name}")
                 continue
 
-            music_items = library_section.all()
+            library_tracks = 0
+            library_changes_start = len(self.updated_tracks)
 
-            if not music_items:
+            # Tracks are I/O bound (Plex HTTP and file tags), so process them concurrently
+            with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
+                try:
+                    for tracks in self._iter_track_pages(library_section):
+                        plex_ratings = self._prefetch_plex_ratings(tracks)
+
+                        for _ in executor.map(
+                            process, tracks, itertools.repeat(plex_ratings)
+                        ):
+                            library_tracks += 1
+                except BaseException:
+                    # Don't wait for the remaining tracks on errors or Ctrl+C
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+
+            if not library_tracks:
                 log_warning(f"No items found in library: **{library_name}**")
-                continue
 
-            for item in music_items:
-                if hasattr(item, "type") and item.type == "artist":
-                    # log_info(f"Artist: **{item.title}**", 1) # Optional: reduce log noise
-
-                    for album in item.albums():
-                        album_tracks = album.tracks()
-                        if not album_tracks:
-                            continue
-                            
-                        # album_path = Path(album_tracks[0].media[0].parts[0].file).parent
-                        # log_info(f"Album: **{album.title}**", 2) # Optional: reduce log noise
-
-                        for track in album_tracks:
-                            self._process_item(track, mode=mode)
-                            processed_tracks += 1
-                            tracks_since_save += 1
-                            
-                            if tracks_since_save >= CACHE_SAVE_INTERVAL:
-                                save_cache()
-                                tracks_since_save = 0
-
-        total_elapsed_item = datetime.now() - total_start_time
+            processed_tracks += library_tracks
+
+            library_changes = self.updated_tracks[library_changes_start:]
+
+            if library_changes:
+                log_warning("\n".join(library_changes))
+
+            # One transaction per library pass
+            save_cache()
+            flush_logs()
+
+        total_elapsed_item = time.perf_counter_ns() - total_start_time
 
         log_info(
             f"Processed **{processed_tracks}** tracks in **{format_time(total_elapsed_item)}**"
         )
-        
-        save_cache()
 
     def _print_summary(self):
         """Prints a summary of all changes made during this run."""
@@ -1,10 +1,11 @@
-def format_time(time_delta):
-    """Format a timedelta into a human readable string."""
-    total_seconds = int(time_delta.total_seconds())
+def format_time(elapsed_ns):
+    """Format a duration in nanoseconds into a human readable string."""
+    total_milliseconds = elapsed_ns // 1_000_000
+    total_seconds = total_milliseconds // 1000
     hours = total_seconds // 3600
     minutes = (total_seconds % 3600) // 60
     seconds = total_seconds % 60
-    milliseconds = int(time_delta.microseconds / 1000)
+    milliseconds = total_milliseconds % 1000
 
     if hours > 0:
         return f"{hours}h {minutes}m {seconds}s"